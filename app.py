@@ -1,175 +1,389 @@
-import streamlit as st
-import pandas as pd
-import re
-import os
-
-# --- CONFIGURATION ---
-st.set_page_config(page_title="YHitT Milano Cortina 2026 Stats Tracker", layout="wide", page_icon="🏒")
-
-# --- 1. LOAD USER ROSTER (Server Side Only) ---
-# ttl=0 ensures that if you replace the file in the folder, 
-# the app picks it up immediately upon refresh.
-@st.cache_data(ttl=0)
-def load_roster():
-    try:
-        if not os.path.exists("fantasy_roster.csv"):
-            return pd.DataFrame()
-            
-        df = pd.read_csv("fantasy_roster.csv")
-        
-        # CLEANUP: Remove common junk rows from the raw export
-        if 'Player_Name' in df.columns:
-            junk_names = ["Draft", "Trade", "Bench", "Slot", "Player", "Acq", "Free Agency", "Waivers"]
-            df = df[~df['Player_Name'].isin(junk_names)]
-            df = df[df['Player_Name'].str.len() > 2]
-            
-        return df
-    except Exception as e:
-        st.error(f"Error loading roster: {e}")
-        return pd.DataFrame()
-
-# --- 2. LOAD QUANTHOCKEY STATS (Server Side Only) ---
-@st.cache_data(ttl=0)
-def load_stats():
-    try:
-        if not os.path.exists("mainquant.csv"):
-            return pd.DataFrame() # No file found
-        
-        df = pd.read_csv("mainquant.csv")
-
-        # 1. Clean Column Names (Remove spaces, lowercase)
-        df.columns = [str(col).strip().lower() for col in df.columns]
-        
-        # 2. Map QuantHockey names to App names
-        rename_map = {}
-        for col in df.columns:
-            if col in ['name', 'player', 'skater']:
-                rename_map[col] = 'Player_Name'
-            elif col in ['g', 'goals']:
-                rename_map[col] = 'Goals'
-            elif col in ['a', 'assists']:
-                rename_map[col] = 'Assists'
-            elif col in ['p', 'pts', 'points']:
-                rename_map[col] = 'Points'
-            elif col in ['team', 'nation', 'country']:
-                rename_map[col] = 'Country'
-
-        df.rename(columns=rename_map, inplace=True)
-        
-        # 3. Validation
-        required = ['Player_Name', 'Goals', 'Assists', 'Points']
-        missing = [req for req in required if req not in df.columns]
-        
-        if missing:
-            st.error(f"❌ 'mainquant.csv' is missing columns: {missing}")
-            return pd.DataFrame()
-            
-        return df
-        
-    except Exception as e:
-        st.error(f"Error reading stats file: {e}")
-        return pd.DataFrame()
-
-# --- 3. HELPER: NAME MATCHING ---
-def normalize(name):
-    """Converts 'Connor McDavid' -> {'connor', 'mcdavid'}"""
-    clean = re.sub(r'[^\w\s]', '', str(name)).lower()
-    return set(clean.split())
-
-def find_match(roster_name, stats_df):
-    """Finds the Olympic stat row that matches the Roster name."""
-    r_parts = normalize(roster_name)
-    
-    for idx, row in stats_df.iterrows():
-        s_parts = normalize(row['Player_Name'])
-        if len(r_parts.intersection(s_parts)) >= 2:
-            return row
-    return None
-
-# --- MAIN APP UI ---
-st.title("🥇 🏒 Your Hat's in the Toilet Milano Cortina 2026 Stats Tracker")
-
-# Sidebar: minimal controls
-with st.sidebar:
-    st.write("Last Updated: Live from file")
-    if st.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.rerun()
-
-# Load Data
-roster = load_roster()
-stats_db = load_stats()
-
-if roster.empty:
-    st.info("⚠️ `fantasy_roster.csv` not found on server.")
-    
-elif stats_db.empty:
-    st.warning("⚠️ Stats file (`mainquant.csv`) not found on server.")
-    st.markdown("Please upload the latest QuantHockey export to the repository/folder.")
-
-else:
-    # --- MERGE LOGIC ---
-    merged_data = []
-    
-    for i, (index, row) in enumerate(roster.iterrows()):
-        r_name = row['Player_Name']
-        team = row['Fantasy_Team']
-        
-        match = find_match(r_name, stats_db)
-        
-        if match is not None:
-            merged_data.append({
-                "Fantasy_Team": team,
-                "Player": r_name,
-                "Olympic_Name": match['Player_Name'],
-                "Goals": match['Goals'],
-                "Assists": match['Assists'],
-                "Points": match['Points']
-            })
-        else:
-            merged_data.append({
-                "Fantasy_Team": team,
-                "Player": r_name,
-                "Olympic_Name": "-",
-                "Goals": 0, "Assists": 0, "Points": 0
-            })
-            
-    final_df = pd.DataFrame(merged_data)
-    
-    # --- DASHBOARD LAYOUT ---
-    
-    # 1. LEADERBOARD
-    st.subheader("Leaderboard")
-    standings = final_df.groupby("Fantasy_Team")[["Goals", "Assists", "Points"]].sum().sort_values("Points", ascending=False)
-    
-    st.dataframe(
-        standings, 
-        use_container_width=True,
-        height=(len(standings) + 1) * 35 
-    )
-    
-    # 2. DETAILED STATS
-    st.divider()
-    st.subheader("Player Breakdown")
-    
-    team_list = sorted(final_df['Fantasy_Team'].unique())
-    selected_team = st.selectbox("Filter by Fantasy Team", ["All Teams"] + team_list)
-    
-    if selected_team != "All Teams":
-        view_df = final_df[final_df['Fantasy_Team'] == selected_team]
-    else:
-        view_df = final_df
-        
-    st.dataframe(
-        view_df.sort_values("Points", ascending=False),
-        column_config={
-            "Points": st.column_config.ProgressColumn(
-                "Points", 
-                format="%d", 
-                min_value=0, 
-                max_value=int(final_df['Points'].max()) if not final_df.empty else 10
-            ),
-        },
-        use_container_width=True,
-        hide_index=True
+import streamlit as st
+import pandas as pd
+import numpy as np
+import os
+import string
+import functools
+from collections import Counter
+
+try:
+    from rapidfuzz import process as rf_process, fuzz as rf_fuzz
+except ImportError:
+    rf_process = None
+
+# --- CONFIGURATION ---
+st.set_page_config(page_title="YHitT Milano Cortina 2026 Stats Tracker", layout="wide", page_icon="🏒")
+
+# --- NAME FOLDING ---
+# Letters NFKD cannot decompose (no combining mark to strip).
+_ASCII_FOLD = str.maketrans({
+    'ø': 'o', 'Ø': 'O', 'æ': 'ae', 'Æ': 'Ae',
+    'ß': 'ss', 'ð': 'd', 'Ð': 'D', 'þ': 'th', 'Þ': 'Th',
+    'ł': 'l', 'Ł': 'L',
+})
+
+def fold_ascii(series):
+    """Folds diacritics to ASCII once at load ('Stützle' -> 'Stutzle').
+
+    QuantHockey names carry accents the fantasy export does not, so
+    folding here keeps the per-name matching ASCII-only.
+    """
+    return (
+        series.astype(str).str.translate(_ASCII_FOLD)
+        .str.normalize('NFKD')
+        .str.encode('ascii', 'ignore').str.decode('ascii')
+    )
+
+# --- CSV READER ---
+def read_csv_fast(path, **kwargs):
+    """pd.read_csv via the multithreaded pyarrow parser, when available."""
+    try:
+        return pd.read_csv(path, engine='pyarrow', **kwargs)
+    except (ImportError, ValueError):
+        # pyarrow missing, or an option it does not support
+        return pd.read_csv(path, **kwargs)
+
+def file_mtime(path):
+    """Cache key for the loaders: replacing a file changes its mtime."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+# --- 1. LOAD USER ROSTER (Server Side Only) ---
+# persist="disk" keeps the parsed frame across app restarts; the mtime
+# argument invalidates it as soon as the file is replaced in the folder.
+@st.cache_data(persist="disk")
+def load_roster(mtime):
+    try:
+        if not os.path.exists("fantasy_roster.csv"):
+            return pd.DataFrame()
+            
+        df = read_csv_fast("fantasy_roster.csv")
+        
+        # CLEANUP: Remove common junk rows from the raw export
+        if 'Player_Name' in df.columns:
+            junk_names = ["Draft", "Trade", "Bench", "Slot", "Player", "Acq", "Free Agency", "Waivers"]
+            df = df[~df['Player_Name'].isin(junk_names)]
+            df = df[df['Player_Name'].str.len() > 2]
+            df['Player_Name'] = fold_ascii(df['Player_Name'])
+
+        # Handful of teams over hundreds of rows: categorical codes make
+        # the leaderboard groupby integer-based instead of string hashing.
+        if 'Fantasy_Team' in df.columns:
+            df['Fantasy_Team'] = df['Fantasy_Team'].astype('category')
+
+        return df
+    except Exception as e:
+        st.error(f"Error loading roster: {e}")
+        return pd.DataFrame()
+
+# --- 2. LOAD QUANTHOCKEY STATS (Server Side Only) ---
+@st.cache_data(persist="disk")
+def load_stats(mtime):
+    try:
+        if not os.path.exists("mainquant.csv"):
+            return pd.DataFrame() # No file found
+        
+        # Skip the QuantHockey columns we never use (Rk, Age, GP, ...)
+        # at the parser level. Read just the header row to resolve which
+        # column names are present in this export.
+        wanted = {'name', 'player', 'skater',
+                  'g', 'goals', 'a', 'assists', 'p', 'pts', 'points',
+                  'team', 'nation', 'country'}
+        header = pd.read_csv("mainquant.csv", nrows=0)
+        keep = [col for col in header.columns if str(col).strip().lower() in wanted]
+
+        # Exports beyond the usual size are streamed in chunks to bound
+        # peak memory; small files keep the single-read fast path.
+        # (chunksize needs the default engine, not pyarrow.)
+        if os.path.getsize("mainquant.csv") > 50 * 1024 * 1024:
+            chunks = pd.read_csv("mainquant.csv", usecols=keep, chunksize=100_000)
+            df = pd.concat(chunks, ignore_index=True)
+        else:
+            df = read_csv_fast("mainquant.csv", usecols=keep)
+
+        # 1. Clean Column Names (Remove spaces, lowercase)
+        df.columns = [str(col).strip().lower() for col in df.columns]
+        
+        # 2. Map QuantHockey names to App names
+        rename_map = {}
+        for col in df.columns:
+            if col in ['name', 'player', 'skater']:
+                rename_map[col] = 'Player_Name'
+            elif col in ['g', 'goals']:
+                rename_map[col] = 'Goals'
+            elif col in ['a', 'assists']:
+                rename_map[col] = 'Assists'
+            elif col in ['p', 'pts', 'points']:
+                rename_map[col] = 'Points'
+            elif col in ['team', 'nation', 'country']:
+                rename_map[col] = 'Country'
+
+        df.rename(columns=rename_map, inplace=True)
+        
+        # 3. Validation
+        required = ['Player_Name', 'Goals', 'Assists', 'Points']
+        missing = [req for req in required if req not in df.columns]
+        
+        if missing:
+            st.error(f"❌ 'mainquant.csv' is missing columns: {missing}")
+            return pd.DataFrame()
+
+        df['Player_Name'] = fold_ascii(df['Player_Name'])
+
+        return df
+        
+    except Exception as e:
+        st.error(f"Error reading stats file: {e}")
+        return pd.DataFrame()
+
+# --- 3. HELPER: NAME MATCHING ---
+# C-level table lookup per code point beats regex dispatch on short names.
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+
+@functools.lru_cache(maxsize=None)
+def normalize(name):
+    """Converts 'Connor McDavid' -> frozenset({'connor', 'mcdavid'})"""
+    return frozenset(str(name).translate(_PUNCT_TABLE).lower().split())
+
+@st.cache_data
+def build_stats_index(stats_mtime):
+    """Builds an inverted index: token -> stats row positions.
+
+    Keyed on the stats file mtime so reruns reuse the index without
+    even hashing the stats frame; a replaced file rebuilds it.
+    """
+    stats_df = load_stats(stats_mtime)
+
+    token_to_rows = {}
+
+    for idx, name in enumerate(stats_df['Player_Name'].tolist()):
+        for tok in normalize(name):
+            token_to_rows.setdefault(tok, []).append(idx)
+
+    return token_to_rows
+
+def find_match(roster_name, token_to_rows):
+    """Finds the stats row position matching the Roster name, or None.
+
+    Returning a position instead of stats_df.iloc[...] spares the caller
+    a boxed Series per match.
+    """
+    r_parts = normalize(roster_name)
+
+    # Count how many roster tokens each candidate stats row shares,
+    # touching only rows that appear in the posting lists.
+    counts = Counter()
+    for tok in r_parts:
+        for idx in token_to_rows.get(tok, ()):
+            counts[idx] += 1
+
+    hits = [idx for idx, count in counts.items() if count >= 2]
+    if hits:
+        return min(hits)
+    return None
+
+# --- 4. MERGE ROSTER + STATS (Cached) ---
+# Generational suffixes that would otherwise be picked up as the surname.
+_NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv'}
+
+# Minimum token_set_ratio score for a fuzzy match to count.
+_FUZZY_CUTOFF = 80
+
+def surname_token(name):
+    """Last non-suffix token of a name, normalized like normalize()."""
+    tokens = [t for t in str(name).translate(_PUNCT_TABLE).lower().split()
+              if t not in _NAME_SUFFIXES]
+    return tokens[-1] if tokens else ''
+
+def name_keys(names):
+    """Vectorized (surname, first initial) key columns for a name Series."""
+    clean = names.astype(str).str.lower().str.replace(r'[^\w\s]', '', regex=True)
+    parts = clean.str.split().apply(
+        lambda toks: [t for t in toks if t not in _NAME_SUFFIXES] or toks
+    )
+    return parts.str[-1], parts.str[0].str[0]
+
+@st.cache_data
+def build_final_df(roster_mtime, stats_mtime):
+    """Matches every roster player to their Olympic stat line.
+
+    The mtime arguments are cache keys only: widget reruns reuse the
+    cached result, and replacing either CSV invalidates it.
+
+    Vectorized hash join on normalized name keys instead of a Python
+    loop over roster rows: surname + first initial first, then surname
+    alone where the surname is unambiguous in the stats table.
+    """
+    roster = load_roster(roster_mtime)
+    stats_db = load_stats(stats_mtime)
+
+    roster = roster.reset_index(drop=True).copy()
+    roster['_last'], roster['_initial'] = name_keys(roster['Player_Name'])
+
+    stats_cols = stats_db[['Player_Name', 'Goals', 'Assists', 'Points']].rename(
+        columns={'Player_Name': 'Olympic_Name'}
+    )
+    stats_cols['_last'], stats_cols['_initial'] = name_keys(stats_cols['Olympic_Name'])
+
+    merge_cols = ['Olympic_Name', 'Goals', 'Assists', 'Points']
+
+    # 1. Surname + first-initial join. keep=False so colliding keys
+    # (e.g. Roberts vs Rihards Bukarts) fall through to the token and
+    # fuzzy passes, which can disambiguate on the full first name.
+    exact = stats_cols.drop_duplicates(subset=['_last', '_initial'], keep=False)
+    final_df = roster.merge(exact, on=['_last', '_initial'], how='left')
+
+    # 2. Surname-only join, restricted to surnames that appear exactly
+    # once in the stats table AND whose first initial agrees -- the
+    # initial is a tiebreaker, not optional, or "Anton Forsberg" gets
+    # credited with Filip Forsberg's line.
+    missing = final_df['Olympic_Name'].isna()
+    if missing.any():
+        unique_last = stats_cols.drop_duplicates(subset='_last', keep=False)
+        by_last = roster.loc[missing, ['_last', '_initial']].merge(
+            unique_last, on='_last', how='left', suffixes=('', '_stats')
+        )
+        disagree = by_last['_initial'] != by_last['_initial_stats']
+        by_last.loc[disagree, merge_cols] = np.nan
+        final_df.loc[missing, merge_cols] = by_last[merge_cols].values
+
+    # 3. Token-overlap fallback for anything the keyed joins missed.
+    # Results are collected in preallocated column arrays and written
+    # back in one block instead of a .loc scalar write per row.
+    missing = final_df['Olympic_Name'].isna()
+    if missing.any():
+        token_to_rows = build_stats_index(stats_mtime)
+        miss_idx = final_df.index[missing]
+
+        names = np.full(len(miss_idx), None, dtype=object)
+        goals = np.zeros(len(miss_idx), dtype=np.int32)
+        assists = np.zeros(len(miss_idx), dtype=np.int32)
+        points = np.zeros(len(miss_idx), dtype=np.int32)
+
+        # Plain tuples per stats row, not iloc Series lookups.
+        stats_rows = list(
+            stats_db[['Player_Name', 'Goals', 'Assists', 'Points']]
+            .itertuples(index=False, name=None)
+        )
+
+        stats_names = stats_db['Player_Name'].tolist()
+
+        residual = []  # (array position, roster name) pairs for the fuzzy pass
+        for i, r_name in enumerate(final_df.loc[miss_idx, 'Player_Name'].tolist()):
+            hit = find_match(r_name, token_to_rows)
+            if hit is not None:
+                names[i], goals[i], assists[i], points[i] = stats_rows[hit]
+            else:
+                residual.append((i, r_name))
+
+        # Last resort: score the whole residual x stats matrix in one
+        # multithreaded rapidfuzz kernel instead of a Python loop of
+        # extractOne calls, then take the argmax per residual name.
+        if residual and rf_process is not None:
+            queries = [r_name for _, r_name in residual]
+            scores = rf_process.cdist(
+                queries, stats_names,
+                scorer=rf_fuzz.token_set_ratio, score_cutoff=_FUZZY_CUTOFF,
+                workers=-1,
+            )
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(queries)), best]
+
+            for (i, r_name), col, score in zip(residual, best, best_scores):
+                if score < _FUZZY_CUTOFF:
+                    continue
+                # token_set_ratio scores >=80 for names sharing only a
+                # first name ("Alexander" vs "Alexander Ehl"), so also
+                # require the surnames themselves to agree.
+                if surname_token(r_name) != surname_token(stats_names[col]):
+                    continue
+                names[i], goals[i], assists[i], points[i] = stats_rows[col]
+
+        final_df.loc[miss_idx, 'Olympic_Name'] = names
+        final_df.loc[miss_idx, 'Goals'] = goals
+        final_df.loc[miss_idx, 'Assists'] = assists
+        final_df.loc[miss_idx, 'Points'] = points
+
+    final_df = final_df.drop(columns=['_last', '_initial'])
+    final_df = final_df.rename(columns={'Player_Name': 'Player'})
+    final_df['Olympic_Name'] = final_df['Olympic_Name'].fillna('-')
+    final_df[['Goals', 'Assists', 'Points']] = (
+        final_df[['Goals', 'Assists', 'Points']].fillna(0).astype(int)
+    )
+    final_df['Fantasy_Team'] = final_df['Fantasy_Team'].astype('category')
+
+    # Precompute the leaderboard and points ceiling here so UI-only
+    # reruns do not redo the groupby/max scans.
+    standings = (
+        final_df.groupby("Fantasy_Team")[["Goals", "Assists", "Points"]]
+        .sum()
+        .sort_values("Points", ascending=False)
+    )
+    max_points = int(final_df['Points'].max()) if not final_df.empty else 10
+
+    return final_df, standings, max_points
+
+# --- MAIN APP UI ---
+st.title("🥇 🏒 Your Hat's in the Toilet Milano Cortina 2026 Stats Tracker")
+
+# Sidebar: minimal controls
+with st.sidebar:
+    st.write("Last Updated: Live from file")
+    if st.button("🔄 Refresh Data"):
+        st.cache_data.clear()
+        st.rerun()
+
+# Load Data
+roster_mtime = file_mtime("fantasy_roster.csv")
+stats_mtime = file_mtime("mainquant.csv")
+roster = load_roster(roster_mtime)
+stats_db = load_stats(stats_mtime)
+
+if roster.empty:
+    st.info("⚠️ `fantasy_roster.csv` not found on server.")
+    
+elif stats_db.empty:
+    st.warning("⚠️ Stats file (`mainquant.csv`) not found on server.")
+    st.markdown("Please upload the latest QuantHockey export to the repository/folder.")
+
+else:
+    # --- MERGE LOGIC ---
+    # Keyed on file mtimes so only a replaced CSV (or Refresh) rebuilds
+    # the merge; selectbox clicks just refilter the cached result.
+    final_df, standings, max_points = build_final_df(roster_mtime, stats_mtime)
+
+    # --- DASHBOARD LAYOUT ---
+
+    # 1. LEADERBOARD
+    st.subheader("Leaderboard")
+
+    st.dataframe(
+        standings, 
+        use_container_width=True,
+        height=(len(standings) + 1) * 35 
+    )
+    
+    # 2. DETAILED STATS
+    st.divider()
+    st.subheader("Player Breakdown")
+    
+    team_list = sorted(final_df['Fantasy_Team'].unique())
+    selected_team = st.selectbox("Filter by Fantasy Team", ["All Teams"] + team_list)
+    
+    if selected_team != "All Teams":
+        view_df = final_df[final_df['Fantasy_Team'] == selected_team]
+    else:
+        view_df = final_df
+        
+    st.dataframe(
+        view_df.sort_values("Points", ascending=False),
+        column_config={
+            "Points": st.column_config.ProgressColumn(
+                "Points", 
+                format="%d", 
+                min_value=0, 
+                max_value=max_points
+            ),
+        },
+        use_container_width=True,
+        hide_index=True
     )
\ No newline at end of file